@@ -1,14 +1,30 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import argparse
 import logging
+from typing import List, Optional
 from src.config.config import Config
 from src.mms.mms_client import MMSClient
 from src.notifications.slack_notifier import SlackNotifier
 from src.utils.logger import setup_logger
+from src.utils.profiler import Profiler, PROFILE_MODES
 
-def main():
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """解析命令列參數"""
+    parser = argparse.ArgumentParser(description='MMS 機構到期通知程式')
+    parser.add_argument(
+        '--profile',
+        choices=PROFILE_MODES,
+        default=None,
+        help='啟用效能分析（mem: 記憶體配置，cpu: 熱點函式），報告寫入日誌檔案所在目錄'
+    )
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
     """主程式入口"""
+    args = parse_args(argv)
+    profiler = None
     try:
         # 設定日誌
         logger = setup_logger()
@@ -27,6 +43,14 @@ def main():
         # 初始化 Slack 通知器
         slack_notifier = SlackNotifier(config.slack_webhook_url)
         
+        # 啟用效能分析
+        if args.profile:
+            logger.info(f"啟用效能分析模式: {args.profile}")
+            profiler = Profiler(args.profile, config.log_file)
+            profiler.wrap(mms_client, 'get_institutions')
+            profiler.wrap(mms_client, 'get_expiring_institutions')
+            profiler.wrap(slack_notifier, 'send_expiring_notification')
+        
         # 取得即將到期的機構
         expiring_institutions = mms_client.get_expiring_institutions(
             days_threshold=config.expiry_threshold
@@ -48,6 +72,15 @@ def main():
     except Exception as e:
         logger.error(f"程式執行過程中發生錯誤: {str(e)}")
         raise
+    
+    finally:
+        # 輸出效能分析報告
+        if profiler:
+            try:
+                profiler.write_reports()
+            except Exception as e:
+                # 報告輸出失敗不可蓋過主程式的例外
+                logger.error(f"輸出效能分析報告時發生錯誤: {str(e)}")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
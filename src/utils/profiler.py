@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import io
+import re
+import sys
+import cProfile
+import pstats
+import inspect
+import logging
+import functools
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+PROFILE_MODES = ('mem', 'cpu')
+
+# 記憶體模式記錄的呼叫堆疊深度，需足以回溯到 src/ 內的呼叫端
+TRACEMALLOC_FRAMES = 25
+
+# 專案原始碼根目錄（src/），用於在呼叫堆疊中找出專案內的呼叫端
+PROJECT_SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# tracemalloc 與匯入機制本身的配置不列入報告
+IGNORED_FILENAMES = frozenset((
+    tracemalloc.__file__,
+    '<frozen importlib._bootstrap>',
+    '<frozen importlib._bootstrap_external>',
+    '<unknown>',
+))
+
+# 呼叫堆疊中沒有 src/ 呼叫端的配置，統一歸入此項
+OTHER_CALLER = '其他（無 src/ 呼叫端）'
+
+# 峰值取樣：配置量需超過上次取樣多少比例（且至少多少位元組）才重新擷取快照
+PEAK_SAMPLE_GROWTH = 1.2
+PEAK_SAMPLE_MIN_BYTES = 64 * 1024
+
+class Profiler:
+    """效能分析器
+
+    mem 模式使用 tracemalloc 在最外層呼叫前後擷取快照，再依呼叫堆疊將配置歸屬到各標籤，
+    並記錄每個標籤執行期間的峰值，以及峰值附近擷取的快照中主要的配置位置；
+    cpu 模式使用 cProfile 記錄熱點函式。巢狀呼叫的成本包含在外層標籤中，並於報告中註明。
+    報告會寫入日誌檔案所在的目錄。
+    """
+
+    def __init__(self, mode: str, log_file: str, top_n: int = 25):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"無效的分析模式: {mode}，可用模式: {', '.join(PROFILE_MODES)}")
+
+        self.mode = mode
+        self.top_n = top_n
+        self.logger = logging.getLogger(__name__)
+
+        # 報告檔案與日誌檔案放在同一目錄
+        self.output_dir = os.path.dirname(os.path.abspath(log_file))
+        self.log_stem = os.path.splitext(os.path.basename(log_file))[0] or 'mms_notify'
+        self.timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+        self._labels: List[str] = []
+        self._calls: Dict[str, int] = {}
+        self._stack: List[str] = []
+        self._nested_in: Dict[str, Set[str]] = {}
+        # 標籤 -> (檔案, 起始行, 結束行, cProfile 統計鍵值)
+        self._targets: Dict[str, Tuple[str, int, int, Tuple[str, int, str]]] = {}
+
+        # cpu 模式：每個最外層標籤一個 cProfile，多次呼叫會累計
+        self._cpu_profiles: Dict[str, cProfile.Profile] = {}
+
+        # mem 模式：依專案呼叫端累計配置大小、次數差異與各實際配置位置的大小
+        self._mem_diffs: Dict[str, Dict[str, list]] = {}
+        self._started_tracemalloc = False
+
+        # mem 模式峰值：執行中的標籤堆疊 [標籤, 進入時配置量, 目前觀察到的峰值]
+        self._mem_frames: List[list] = []
+        self._mem_peaks: Dict[str, int] = {}
+        self._mem_before: Optional[tracemalloc.Snapshot] = None
+        self._next_sample_at = 0
+        # 標籤 -> (取樣時高於進入時的配置量, 峰值快照, 最外層呼叫前的快照)
+        self._peak_samples: Dict[str, Tuple[int, tracemalloc.Snapshot, tracemalloc.Snapshot]] = {}
+
+    def wrap(self, obj: Any, method_name: str, label: Optional[str] = None) -> None:
+        """以分析版本取代物件上的方法
+
+        Args:
+            obj: 目標物件
+            method_name: 方法名稱
+            label: 報告中的標籤（預設為類別名稱加方法名稱）
+        """
+        method = getattr(obj, method_name)
+        label = label or f"{type(obj).__name__}.{method_name}"
+        self._targets[label] = self._get_source_span(method)
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            with self.profile(label):
+                return method(*args, **kwargs)
+
+        setattr(obj, method_name, wrapper)
+
+    def _get_source_span(self, method: Any) -> Tuple[str, int, int, Tuple[str, int, str]]:
+        """取得方法原始碼的檔案、起訖行號與 cProfile 統計鍵值"""
+        func = inspect.unwrap(getattr(method, '__func__', method))
+        code = func.__code__
+        try:
+            lines, start = inspect.getsourcelines(func)
+            end = start + len(lines) - 1
+        except (OSError, TypeError):
+            start = end = code.co_firstlineno
+        return code.co_filename, start, end, (code.co_filename, code.co_firstlineno, code.co_name)
+
+    @contextmanager
+    def profile(self, label: str):
+        """分析區塊內的執行
+
+        只有最外層的呼叫會啟動分析，巢狀呼叫僅記錄次數、所屬的外層標籤與記憶體峰值。
+        """
+        if label not in self._calls:
+            self._labels.append(label)
+            self._calls[label] = 0
+        self._calls[label] += 1
+
+        if self._stack:
+            self._nested_in.setdefault(label, set()).add(self._stack[0])
+            self._stack.append(label)
+            try:
+                if self.mode == 'mem':
+                    with self._track_peak(label):
+                        yield
+                else:
+                    yield
+            finally:
+                self._stack.pop()
+            return
+
+        self._stack.append(label)
+        try:
+            if self.mode == 'mem':
+                with self._profile_mem(label):
+                    yield
+            else:
+                with self._profile_cpu(label):
+                    yield
+        finally:
+            self._stack.pop()
+
+    @contextmanager
+    def _profile_cpu(self, label: str):
+        profile = self._cpu_profiles.setdefault(label, cProfile.Profile())
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+
+    @contextmanager
+    def _profile_mem(self, label: str):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._started_tracemalloc = True
+        elif not self._started_tracemalloc and tracemalloc.get_traceback_limit() < TRACEMALLOC_FRAMES:
+            self.logger.warning(
+                f"tracemalloc 已以 {tracemalloc.get_traceback_limit()} 層堆疊啟動，"
+                f"記憶體配置可能無法歸屬到 src/ 內的呼叫端"
+            )
+
+        # 快照本身不會被 tracemalloc 追蹤，因此不影響峰值
+        before = tracemalloc.take_snapshot()
+        self._mem_before = before
+        previous_hook = sys.getprofile()
+        try:
+            with self._track_peak(label):
+                sys.setprofile(self._sample_peaks)
+                try:
+                    yield
+                finally:
+                    sys.setprofile(previous_hook)
+        finally:
+            self._mem_before = None
+            after = tracemalloc.take_snapshot()
+            # 在分組後的差異上過濾，避免 filter_traces 逐筆比對所有追蹤記錄
+            for stat in after.compare_to(before, 'traceback'):
+                if not stat.size_diff and not stat.count_diff:
+                    continue
+                self._accumulate(self._mem_diffs.setdefault(label, {}), stat)
+                for inner in self._labels_in_traceback(stat.traceback, exclude=label):
+                    self._accumulate(self._mem_diffs.setdefault(inner, {}), stat)
+
+    @contextmanager
+    def _track_peak(self, label: str):
+        """記錄標籤執行期間高於進入時的配置峰值
+
+        tracemalloc 只有一個峰值計數器，進入內層標籤前先把外層目前的峰值保存起來再重設，
+        離開時再併回外層。
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        if self._mem_frames:
+            outer = self._mem_frames[-1]
+            outer[2] = max(outer[2], peak)
+        tracemalloc.reset_peak()
+        frame = [label, current, current]
+        self._mem_frames.append(frame)
+        self._update_sample_threshold()
+        try:
+            yield
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            self._mem_frames.pop()
+            self._update_sample_threshold()
+            frame_peak = max(frame[2], peak)
+            self._mem_peaks[label] = max(self._mem_peaks.get(label, 0), frame_peak - frame[1])
+            if self._mem_frames:
+                outer = self._mem_frames[-1]
+                outer[2] = max(outer[2], frame_peak)
+
+    def _sample_threshold(self, label: str, entry_size: int) -> int:
+        """標籤需達到的配置量，達到後才重新擷取峰值快照"""
+        best = self._peak_samples.get(label, (0, None, None))[0]
+        return entry_size + max(PEAK_SAMPLE_MIN_BYTES, int(best * PEAK_SAMPLE_GROWTH))
+
+    def _update_sample_threshold(self) -> None:
+        self._next_sample_at = min(
+            (self._sample_threshold(label, entry_size) for label, entry_size, _ in self._mem_frames),
+            default=0
+        )
+
+    def _sample_peaks(self, frame: Any, event: str, arg: Any) -> None:
+        """sys.setprofile 回呼：在每次函式返回時檢查配置量，創新高時擷取快照
+
+        暫時性的物件（例如除錯字串、Slack 區塊列表）在建立它的呼叫返回時必定仍存在，
+        因此在返回事件檢查即可捕捉到，不需逐行追蹤。
+        """
+        if event != 'return' and event != 'c_return':
+            return
+        current, _ = tracemalloc.get_traced_memory()
+        if current < self._next_sample_at or self._mem_before is None:
+            return
+
+        snapshot = tracemalloc.take_snapshot()
+        for label, entry_size, _ in self._mem_frames:
+            if current >= self._sample_threshold(label, entry_size):
+                self._peak_samples[label] = (current - entry_size, snapshot, self._mem_before)
+        self._update_sample_threshold()
+
+    def _labels_in_traceback(self, traceback: tracemalloc.Traceback, exclude: str) -> List[str]:
+        """找出呼叫堆疊中經過的其他已包裝方法"""
+        found = []
+        for label, (filename, start, end, _) in self._targets.items():
+            if label == exclude:
+                continue
+            if any(frame.filename == filename and start <= frame.lineno <= end for frame in traceback):
+                found.append(label)
+        return found
+
+    def _caller_of(self, traceback: tracemalloc.Traceback) -> Optional[str]:
+        """由最近的呼叫往外找第一個位於 src/ 內的呼叫端
+
+        Returns:
+            Optional[str]: 呼叫端位置；分析器本身（含其 contextmanager）造成的配置回傳 None
+        """
+        if traceback[-1].filename in IGNORED_FILENAMES:
+            return None
+        for frame in reversed(traceback):
+            if frame.filename == __file__:
+                return None
+            if frame.filename.startswith(PROJECT_SRC_DIR):
+                return self._format_frame(frame)
+        return OTHER_CALLER
+
+    def _accumulate(self, entries: Dict[str, list], stat: tracemalloc.StatisticDiff) -> None:
+        """將配置差異依專案呼叫端累計"""
+        caller = self._caller_of(stat.traceback)
+        if caller is None:
+            return
+        entry = entries.setdefault(caller, [0, 0, {}])
+        entry[0] += stat.size_diff
+        entry[1] += stat.count_diff
+        origins = entry[2]
+        origin_key = self._format_frame(stat.traceback[-1])
+        origins[origin_key] = origins.get(origin_key, 0) + stat.size_diff
+
+    def _format_frame(self, frame: tracemalloc.Frame) -> str:
+        """格式化堆疊位置，專案內的檔案以相對路徑顯示"""
+        filename = frame.filename
+        if filename.startswith(PROJECT_SRC_DIR):
+            filename = os.path.relpath(filename, os.path.dirname(PROJECT_SRC_DIR))
+        return f"{filename}:{frame.lineno}"
+
+    def _nested_note(self, label: str) -> Optional[str]:
+        """產生巢狀呼叫的說明文字"""
+        notes = []
+        parents = self._nested_in.get(label)
+        if parents:
+            notes.append(f"註：此標籤曾於 {', '.join(sorted(parents))} 內執行，該部分成本已包含在外層標籤中")
+        children = sorted(inner for inner, outers in self._nested_in.items() if label in outers)
+        if children:
+            notes.append(f"註：此標籤的成本包含巢狀執行的 {', '.join(children)}")
+        return '\n'.join(notes) or None
+
+    def _format_size(self, size: int) -> str:
+        """將位元組數轉換為易讀格式"""
+        value = float(size)
+        for unit in ('B', 'KiB', 'MiB'):
+            if abs(value) < 1024:
+                return f"{value:+.1f} {unit}"
+            value /= 1024
+        return f"{value:+.1f} GiB"
+
+    def _report_path(self, suffix: str) -> str:
+        return os.path.join(self.output_dir, f"{self.log_stem}_{self.timestamp}{suffix}")
+
+    def _format_entries(self, entries: Dict[str, list]) -> List[str]:
+        """列出配置量最大的呼叫端"""
+        lines = []
+        top = sorted(entries.items(), key=lambda item: abs(item[1][0]), reverse=True)[:self.top_n]
+        for index, (caller, (size, count, origins)) in enumerate(top, 1):
+            # 標示此呼叫端底下配置最多的實際位置（例如 JSON 解碼器）
+            origin = max(origins, key=lambda key: abs(origins[key]))
+            location = caller if caller == origin else f"{caller}（主要配置於 {origin}）"
+            lines.append(f"#{index}: {location}: {self._format_size(size)}（{count:+d} 個區塊）")
+        return lines
+
+    def _peak_entries(self, label: str) -> Dict[str, list]:
+        """比較峰值快照與最外層呼叫前的快照，取得峰值時仍存在的配置"""
+        _, snapshot, before = self._peak_samples[label]
+        entries: Dict[str, list] = {}
+        for stat in snapshot.compare_to(before, 'traceback'):
+            if stat.size_diff <= 0:
+                continue
+            # 巢狀標籤只計入呼叫堆疊經過該標籤的配置
+            if self._nested_in.get(label) and label not in self._labels_in_traceback(stat.traceback, exclude=''):
+                continue
+            self._accumulate(entries, stat)
+        return entries
+
+    def _build_mem_report(self) -> str:
+        lines = [f"=== 記憶體配置分析報告 ({self.timestamp}) ==="]
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        lines.append(f"目前追蹤記憶體: {self._format_size(current)}，峰值: {self._format_size(peak)}")
+
+        for label in self._labels:
+            diffs = self._mem_diffs.get(label, {})
+            total = sum(entry[0] for entry in diffs.values())
+            lines.append("")
+            lines.append(
+                f"--- {label}（呼叫 {self._calls[label]} 次，淨配置 {self._format_size(total)}，"
+                f"區段內峰值 {self._format_size(self._mem_peaks.get(label, 0))}）---"
+            )
+            note = self._nested_note(label)
+            if note:
+                lines.append(note)
+
+            lines.append("呼叫結束後仍保留的配置：")
+            lines.extend(self._format_entries(diffs))
+
+            if label in self._peak_samples:
+                sampled = self._peak_samples[label][0]
+                lines.append(f"峰值附近的配置（快照擷取於高於進入時 {self._format_size(sampled)} 處）：")
+                lines.extend(self._format_entries(self._peak_entries(label)))
+            else:
+                lines.append("峰值附近的配置：區段內配置量過小，未擷取快照")
+        return '\n'.join(lines) + '\n'
+
+    def _build_cpu_report(self, label: str) -> str:
+        header = f"--- {label}（呼叫 {self._calls[label]} 次）---"
+        note = self._nested_note(label)
+        if note:
+            header = f"{header}\n{note}"
+
+        stream = io.StringIO()
+        profile = self._cpu_profiles.get(label)
+        if profile is not None:
+            stats = pstats.Stats(profile, stream=stream)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top_n)
+            return f"{header}\n{stream.getvalue()}"
+
+        # 只以巢狀方式執行的標籤沒有獨立的 cProfile，改從外層標籤的統計中擷取該函式
+        func_key = self._targets[label][3]
+        restriction = f"^{re.escape(pstats.func_std_string(func_key))}$"
+        for parent in sorted(self._nested_in.get(label, ())):
+            parent_profile = self._cpu_profiles.get(parent)
+            if parent_profile is None:
+                continue
+            stream.write(f"（擷取自 {parent} 的統計資料）\n")
+            stats = pstats.Stats(parent_profile, stream=stream)
+            if func_key not in stats.stats:
+                stream.write("無此函式的統計資料\n")
+                continue
+            stats.sort_stats(pstats.SortKey.CUMULATIVE)
+            stats.print_stats(restriction)
+            stats.print_callees(restriction)
+
+        return f"{header}\n{stream.getvalue()}"
+
+    def write_reports(self) -> List[str]:
+        """將分析結果寫入日誌目錄
+
+        Returns:
+            List[str]: 已寫入的報告檔案路徑
+        """
+        paths = []
+        try:
+            if self.mode == 'mem':
+                path = self._report_path('_mem_profile.txt')
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(self._build_mem_report())
+                paths.append(path)
+            else:
+                sections = [f"=== CPU 熱點分析報告 ({self.timestamp}) ==="]
+                for label in self._labels:
+                    sections.append(self._build_cpu_report(label))
+
+                    profile = self._cpu_profiles.get(label)
+                    if profile is None:
+                        continue
+
+                    # 另存原始統計資料，供 pstats 或 snakeviz 等工具進一步分析
+                    raw_path = self._report_path(f"_cpu_{label.replace('.', '_')}.pstats")
+                    profile.dump_stats(raw_path)
+                    paths.append(raw_path)
+
+                path = self._report_path('_cpu_profile.txt')
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write('\n\n'.join(sections))
+                paths.insert(0, path)
+
+            for path in paths:
+                self.logger.info(f"已寫入效能分析報告: {path}")
+
+        except OSError as e:
+            self.logger.error(f"無法寫入效能分析報告: {str(e)}")
+
+        finally:
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+            self._peak_samples.clear()
+
+        return paths
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import tracemalloc
+
+import pytest
+
+from src.utils.profiler import Profiler
+
+class FakeClient:
+    """模擬 MMSClient：外層方法逐頁呼叫內層方法"""
+
+    def __init__(self, pages: int = 3):
+        self.pages = pages
+
+    def get_institutions(self, page: int = 1):
+        if page > self.pages:
+            return []
+        return [{'name': f'org-{page}-{i}', 'payload': 'x' * 1024} for i in range(50)]
+
+    def get_expiring_institutions(self):
+        all_institutions = []
+        page = 1
+        while True:
+            institutions = self.get_institutions(page=page)
+            if not institutions:
+                break
+            all_institutions.extend(institutions)
+            page += 1
+        # 暫時性的除錯字串，呼叫結束前即釋放
+        debug_text = repr(all_institutions)
+        return all_institutions if debug_text else []
+
+@pytest.fixture
+def client():
+    return FakeClient(pages=3)
+
+def _wrap(profiler: Profiler, client: FakeClient):
+    profiler.wrap(client, 'get_institutions')
+    profiler.wrap(client, 'get_expiring_institutions')
+
+@pytest.mark.parametrize('mode', ['mem', 'cpu'])
+def test_nested_calls_are_counted_and_attributed(tmp_path, client, mode):
+    profiler = Profiler(mode, str(tmp_path / 'mms_notify.log'))
+    _wrap(profiler, client)
+
+    result = client.get_expiring_institutions()
+    profiler.write_reports()
+
+    assert len(result) == 150
+    assert profiler._calls == {
+        'FakeClient.get_expiring_institutions': 1,
+        'FakeClient.get_institutions': 4,
+    }
+    assert profiler._nested_in == {
+        'FakeClient.get_institutions': {'FakeClient.get_expiring_institutions'},
+    }
+    assert profiler._stack == []
+
+def test_mem_report_is_written(tmp_path, client):
+    profiler = Profiler('mem', str(tmp_path / 'mms_notify.log'))
+    _wrap(profiler, client)
+
+    client.get_expiring_institutions()
+    paths = profiler.write_reports()
+
+    assert len(paths) == 1
+    assert os.path.dirname(paths[0]) == str(tmp_path)
+    assert paths[0].endswith('_mem_profile.txt')
+    with open(paths[0], encoding='utf-8') as f:
+        report = f.read()
+    assert '--- FakeClient.get_expiring_institutions' in report
+    assert '--- FakeClient.get_institutions' in report
+    assert '區段內峰值' in report
+    # 暫時性的除錯字串會使峰值高於淨配置
+    outer = 'FakeClient.get_expiring_institutions'
+    net = sum(entry[0] for entry in profiler._mem_diffs[outer].values())
+    assert profiler._mem_peaks[outer] > net
+    assert not tracemalloc.is_tracing()
+
+def test_cpu_reports_are_written(tmp_path, client):
+    profiler = Profiler('cpu', str(tmp_path / 'mms_notify.log'))
+    _wrap(profiler, client)
+
+    client.get_expiring_institutions()
+    paths = profiler.write_reports()
+
+    assert all(os.path.dirname(path) == str(tmp_path) for path in paths)
+    assert paths[0].endswith('_cpu_profile.txt')
+    assert paths[1].endswith('_cpu_FakeClient_get_expiring_institutions.pstats')
+    assert len(paths) == 2
+    with open(paths[0], encoding='utf-8') as f:
+        report = f.read()
+    # 只以巢狀方式執行的標籤仍保留區段，並從外層統計中擷取
+    assert '--- FakeClient.get_institutions（呼叫 4 次）---' in report
+    assert '（擷取自 FakeClient.get_expiring_institutions 的統計資料）' in report
+    assert 'test_profiler.py:17(get_institutions)' in report
+
+def test_invalid_mode(tmp_path):
+    with pytest.raises(ValueError):
+        Profiler('io', str(tmp_path / 'mms_notify.log'))